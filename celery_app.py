@@ -28,7 +28,27 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes max per task
     task_soft_time_limit=None,  # Disable soft timeout for Windows
-    worker_prefetch_multiplier=1,  # Process one task at a time
+    # The pool stays at Celery's prefork default: gevent/eventlet only work when
+    # selected with -P, which monkey-patches sockets before the worker starts
+    # (see start_worker.py / start_worker_windows.py)
+    worker_prefetch_multiplier=1,  # Reserve one task per pool slot
     worker_max_tasks_per_child=50,  # Restart worker after 50 tasks
+    worker_max_memory_per_child=1_500_000,  # Restart a child above ~1.5 GB RSS (in KB); only prefork enforces this
+    task_acks_late=True,  # Ack only after the task finishes so crashes requeue it
+    task_reject_on_worker_lost=True,  # Requeue tasks whose worker process died
     broker_connection_retry_on_startup=True,  # Fix deprecation warning
+    broker_pool_limit=int(os.getenv("CELERY_BROKER_POOL_LIMIT", "10")),  # Reused broker connections per process
+    redis_backend_health_check_interval=30,  # Ping idle result-backend connections before reuse
+    task_routes={
+        # I/O-bound LLM work goes to green-thread workers; CPU-heavy tasks
+        # should get their own queue served by a prefork worker
+        "tasks.analyze_financial_document_task": {"queue": "analysis"},
+    },
+    beat_schedule={
+        # Keeps the analysis_stats materialized view read by /stats current
+        "refresh-analysis-stats": {
+            "task": "tasks.refresh_analysis_stats",
+            "schedule": 60.0,
+        },
+    },
 )
\ No newline at end of file
@@ -2,9 +2,13 @@
 """
 Check what's stored in the database
 """
-from database import SessionLocal, AnalysisResult, AnalysisCache, User
+from sqlalchemy import func
+from database import SessionLocal, AnalysisResult, AnalysisCache, User, decompress_text
 from datetime import datetime
 
+# Maximum number of rows listed per table
+LISTING_LIMIT = 50
+
 def check_database():
     """Display all data stored in the database"""
     
@@ -18,7 +22,20 @@ def check_database():
         print("\n📊 ANALYSIS RESULTS:")
         print("-" * 70)
         
-        analyses = db.query(AnalysisResult).order_by(AnalysisResult.created_at.desc()).all()
+        # Only fetch short previews of the large text columns
+        analyses = db.query(
+            AnalysisResult.id,
+            AnalysisResult.job_id,
+            AnalysisResult.filename,
+            AnalysisResult.file_size_mb,
+            func.substr(AnalysisResult.query, 1, 80).label("query_preview"),
+            AnalysisResult.status,
+            AnalysisResult.created_at,
+            AnalysisResult.completed_at,
+            AnalysisResult.processing_time_seconds,
+            func.substr(AnalysisResult.detailed_result, 1, 200).label("result_preview"),
+            func.jsonb_array_length(AnalysisResult.agents_used).label("agents_count")
+        ).order_by(AnalysisResult.created_at.desc()).limit(LISTING_LIMIT).all()
         
         if analyses:
             for i, analysis in enumerate(analyses, 1):
@@ -26,18 +43,18 @@ def check_database():
                 print(f"   Job ID: {analysis.job_id}")
                 print(f"   Filename: {analysis.filename}")
                 print(f"   File Size: {analysis.file_size_mb} MB")
-                print(f"   Query: {analysis.query[:80]}...")
+                print(f"   Query: {analysis.query_preview}...")
                 print(f"   Status: {analysis.status}")
                 print(f"   Created: {analysis.created_at}")
                 print(f"   Completed: {analysis.completed_at}")
                 print(f"   Processing Time: {analysis.processing_time_seconds} seconds")
                 
-                if analysis.detailed_result:
-                    result_preview = analysis.detailed_result[:200].replace('\n', ' ')
+                if analysis.result_preview:
+                    result_preview = analysis.result_preview.replace('\n', ' ')
                     print(f"   Result Preview: {result_preview}...")
                 
-                if analysis.agents_used:
-                    print(f"   Agents Used: {len(analysis.agents_used)} agents")
+                if analysis.agents_count:
+                    print(f"   Agents Used: {analysis.agents_count} agents")
         else:
             print("   No analyses found in database")
         
@@ -45,7 +62,7 @@ def check_database():
         print("\n\n💾 ANALYSIS CACHE:")
         print("-" * 70)
         
-        cache_entries = db.query(AnalysisCache).order_by(AnalysisCache.created_at.desc()).all()
+        cache_entries = db.query(AnalysisCache).order_by(AnalysisCache.created_at.desc()).limit(LISTING_LIMIT).all()
         
         if cache_entries:
             for i, cache in enumerate(cache_entries, 1):
@@ -58,7 +75,7 @@ def check_database():
                 print(f"   Last Accessed: {cache.last_accessed}")
                 
                 if cache.analysis_result:
-                    result_preview = cache.analysis_result[:200].replace('\n', ' ')
+                    result_preview = decompress_text(cache.analysis_result)[:200].replace('\n', ' ')
                     print(f"   Cached Result: {result_preview}...")
         else:
             print("   No cache entries found")
@@ -67,7 +84,7 @@ def check_database():
         print("\n\n👥 USERS:")
         print("-" * 70)
         
-        users = db.query(User).order_by(User.created_at.desc()).all()
+        users = db.query(User).order_by(User.created_at.desc()).limit(LISTING_LIMIT).all()
         
         if users:
             for i, user in enumerate(users, 1):
@@ -81,23 +98,34 @@ def check_database():
             print("   No users found")
         
         # Summary
+        total_analyses = db.query(func.count(AnalysisResult.id)).scalar()
+        total_cache_entries = db.query(func.count(AnalysisCache.id)).scalar()
+        total_users = db.query(func.count(User.id)).scalar()
+        
         print("\n\n📈 SUMMARY:")
         print("-" * 70)
-        print(f"   Total Analyses: {len(analyses)}")
-        print(f"   Cached Results: {len(cache_entries)}")
-        print(f"   Total Users: {len(users)}")
+        print(f"   Total Analyses: {total_analyses}")
+        print(f"   Cached Results: {total_cache_entries}")
+        print(f"   Total Users: {total_users}")
         
-        if analyses:
-            completed = sum(1 for a in analyses if a.status == "completed")
-            failed = sum(1 for a in analyses if a.status == "failed")
-            pending = sum(1 for a in analyses if a.status in ["queued", "processing"])
+        if total_analyses:
+            status_stats = db.query(
+                AnalysisResult.status,
+                func.count(AnalysisResult.id),
+                func.avg(AnalysisResult.processing_time_seconds)
+            ).group_by(AnalysisResult.status).all()
+            
+            status_counts = {status: count for status, count, _ in status_stats}
+            completed = status_counts.get("completed", 0)
+            failed = status_counts.get("failed", 0)
+            pending = status_counts.get("queued", 0) + status_counts.get("processing", 0)
             
             print(f"   Completed: {completed}")
             print(f"   Failed: {failed}")
             print(f"   Pending: {pending}")
             
-            if completed > 0:
-                avg_time = sum(a.processing_time_seconds for a in analyses if a.processing_time_seconds) / completed
+            avg_time = next((avg for status, _, avg in status_stats if status == "completed"), None)
+            if avg_time is not None:
                 print(f"   Average Processing Time: {avg_time:.2f} seconds")
         
         print("\n" + "=" * 70)
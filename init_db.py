@@ -3,7 +3,9 @@
 Initialize the database for Financial Document Analyzer
 """
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
+from alembic import command
+from alembic.config import Config
 from database import Base, create_tables
 from dotenv import load_dotenv
 
@@ -32,9 +34,18 @@ def init_database():
             version = result.fetchone()[0]
             print(f"✅ Connected to PostgreSQL: {version.split(',')[0]}")
         
-        # Create all tables
-        print("📋 Creating database tables...")
-        Base.metadata.create_all(bind=engine)
+        alembic_cfg = Config("alembic.ini")
+        if inspect(engine).has_table("analysis_results"):
+            # Existing databases may predate the latest models; migrate them
+            print("📋 Applying database migrations...")
+            command.upgrade(alembic_cfg, "head")
+        else:
+            # Create all tables
+            print("📋 Creating database tables...")
+            Base.metadata.create_all(bind=engine)
+            
+            # Fresh tables match the latest models, so mark all migrations as applied
+            command.stamp(alembic_cfg, "head")
         
         print("✅ Database initialization completed successfully!")
         print("\n📊 Created tables:")
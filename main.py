@@ -1,28 +1,112 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, BackgroundTasks, Request, Query
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+import asyncio
+import json
 import os
+import sys
+from contextlib import asynccontextmanager, suppress
 import uuid
 import hashlib
-from datetime import datetime
-from typing import Optional
+import functools
+import time
+from typing import List, Optional
+from sqlalchemy import update, select, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from sqlalchemy.engine import Connection
+import aiofiles
+import orjson
+import redis.asyncio as redis
 
 # Celery and Redis imports
 from celery.result import AsyncResult
-from tasks import analyze_financial_document_task
-from database import get_db, create_tables, AnalysisResult, User, AnalysisCache
+from celery_app import REDIS_URL
+from tasks import analyze_financial_document_task, get_query_hash, get_cache_key, get_upload_blob_key, get_stream_channel, CACHE_TTL_SECONDS
+from database import utcnow, get_db, get_read_conn, read_connection, create_tables, SessionLocal, AnalysisResult, User, AnalysisCache, compress_text, decompress_text
+
+# Upload limits
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# "redis" hands uploads to workers through Redis instead of a shared data/ volume
+UPLOAD_TRANSPORT = os.getenv("UPLOAD_TRANSPORT", "disk")
+UPLOAD_BLOB_CHUNK_SIZE = 1024 * 1024
+# Blobs must outlive the longest time a job can wait in the queue, or the
+# worker finds the upload gone and fails the job
+UPLOAD_BLOB_TTL_SECONDS = int(os.getenv("UPLOAD_BLOB_TTL_SECONDS", str(24 * 60 * 60)))
+
+# Most job IDs accepted by one batched /status request
+MAX_STATUS_BATCH = 100
+
+# Shared Redis connection pool for the cache tier and Celery state reads
+redis_pool = redis.ConnectionPool.from_url(REDIS_URL, max_connections=50)
+redis_cache = redis.Redis(connection_pool=redis_pool)
+
+# New job records are buffered and inserted in batches by a background flusher
+RECORD_BATCH_SIZE = 64
+RECORD_FLUSH_INTERVAL = 0.01  # seconds to wait for a batch to fill
+pending_records: asyncio.Queue = asyncio.Queue()
+
+# Serialized responses of polled endpoints, keyed by endpoint name
+_ttl_cache: dict = {}
+
+def ttl_cached(ttl: float = 2.0):
+    """Serve an endpoint's last successful response for ttl seconds"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            now = time.monotonic()
+            cached = _ttl_cache.get(fn.__name__)
+            if cached and cached[0] > now:
+                return Response(content=cached[1], media_type="application/json")
+            
+            result = await fn(*args, **kwargs)
+            if isinstance(result, Response):
+                # Error responses are not cached
+                return result
+            body = orjson.dumps(result)
+            _ttl_cache[fn.__name__] = (now + ttl, body)
+            return Response(content=body, media_type="application/json")
+        return wrapper
+    return decorator
+
+def warm_db_pool():
+    """Check out a database connection with a trivial query"""
+    with read_connection() as conn:
+        conn.execute(text("SELECT 1"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema is managed by init_db.py / Alembic; create tables here only for local dev
+    if os.getenv("AUTO_CREATE_TABLES") == "1":
+        create_tables()
+    else:
+        # Open one pooled connection so the first request doesn't pay for it
+        await asyncio.to_thread(warm_db_pool)
+    os.makedirs("data", exist_ok=True)
+    record_flusher = asyncio.create_task(flush_analysis_records())
+    yield
+    # Write out any buffered job records before shutting down
+    record_flusher.cancel()
+    with suppress(asyncio.CancelledError):
+        await record_flusher
+    remaining_records = []
+    while not pending_records.empty():
+        remaining_records.append(pending_records.get_nowait())
+    if remaining_records:
+        await asyncio.to_thread(save_analysis_records, remaining_records)
+    # Release pooled Redis connections on shutdown
+    await redis_cache.aclose()
+    await redis_pool.disconnect()
 
 app = FastAPI(
     title="Financial Document Analyzer",
     description="AI-powered financial document analysis system using CrewAI with Redis Queue and Database Integration",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# Create database tables on startup
-@app.on_event("startup")
-async def startup_event():
-    create_tables()
-
 def get_client_info(request) -> dict:
     """Extract client information for user tracking"""
     return {
@@ -30,35 +114,222 @@ def get_client_info(request) -> dict:
         "user_agent": request.headers.get("user-agent", "unknown")
     }
 
+def lookup_cached_analysis(db: Session, file_hash: str, query_hash: str) -> Optional[dict]:
+    """Return a cached analysis for this document and query, recording the hit"""
+    cache_table = AnalysisCache.__table__
+    
+    # Count the hit and fetch the entry in one atomic UPDATE ... RETURNING
+    cached_row = db.execute(
+        update(cache_table)
+        .where(
+            cache_table.c.file_hash == file_hash,
+            cache_table.c.query_hash == query_hash
+        )
+        .values(
+            access_count=cache_table.c.access_count + 1,
+            last_accessed=utcnow()
+        )
+        .returning(cache_table.c.analysis_result, cache_table.c.agents_used)
+    ).first()
+    db.commit()
+    
+    if not cached_row:
+        return None
+    
+    return {
+        "result": decompress_text(cached_row.analysis_result),
+        "agents_used": cached_row.agents_used
+    }
+
+def insert_analysis_records(records: list) -> None:
+    """Insert a batch of job records, skipping any the worker has already created"""
+    db = SessionLocal()
+    try:
+        db.execute(
+            pg_insert(AnalysisResult.__table__)
+            .values(records)
+            .on_conflict_do_nothing(index_elements=["job_id"])
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def save_analysis_records(records: list) -> None:
+    """Insert job records as one batch, falling back to one insert per record"""
+    try:
+        insert_analysis_records(records)
+        return
+    except Exception as e:
+        print(f"Failed to insert {len(records)} job records, retrying individually: {e}")
+    
+    # Isolate the bad record instead of losing the whole batch; until a job's
+    # record exists /status and /result answer 404 for it
+    for record in records:
+        try:
+            insert_analysis_records([record])
+        except Exception as e:
+            print(f"Failed to insert job record {record['job_id']}: {e}")
+
+async def flush_analysis_records():
+    """Drain queued job records and insert them with one statement per batch"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = []
+        try:
+            batch.append(await pending_records.get())
+            deadline = loop.time() + RECORD_FLUSH_INTERVAL
+            while len(batch) < RECORD_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(pending_records.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            await asyncio.to_thread(save_analysis_records, batch)
+        except asyncio.CancelledError:
+            # Hand the batch back for the shutdown drain; re-inserting records
+            # an interrupted insert already wrote is a no-op
+            for record in batch:
+                pending_records.put_nowait(record)
+            raise
+
+async def get_cached_analysis(db: Session, file_hash: str, query_hash: str) -> Optional[dict]:
+    """Look up a cached analysis in Redis, falling back to the PostgreSQL cache"""
+    cache_key = get_cache_key(file_hash, query_hash)
+    
+    try:
+        cached_payload = await redis_cache.get(cache_key)
+        if cached_payload:
+            return json.loads(decompress_text(cached_payload))
+    except Exception as e:
+        print(f"Redis cache lookup failed: {e}")
+    
+    cached_analysis = await asyncio.to_thread(lookup_cached_analysis, db, file_hash, query_hash)
+    
+    # Promote PostgreSQL hits into Redis for the next request
+    if cached_analysis:
+        try:
+            await redis_cache.setex(cache_key, CACHE_TTL_SECONDS, compress_text(json.dumps(cached_analysis)))
+        except Exception as e:
+            print(f"Redis cache write failed: {e}")
+    
+    return cached_analysis
+
+# Only Linux's os.sendfile copies between regular files; macOS/BSD require a socket
+SENDFILE_SUPPORTED = sys.platform.startswith("linux")
+
+def sendfile_upload(spooled_file, file_path: str) -> tuple:
+    """Copy an upload Starlette spooled to disk with os.sendfile, returning its size and hash"""
+    # fileno() rolls an in-memory upload over to its temporary file first
+    src_fd = spooled_file.fileno()
+    file_size = os.fstat(src_fd).st_size
+    if file_size > MAX_FILE_SIZE:
+        return file_size, None
+    
+    # Hash the spooled source; file_digest (3.11+) runs the read loop in C
+    with open(src_fd, "rb", closefd=False) as src:
+        src.seek(0)
+        if hasattr(hashlib, "file_digest"):
+            file_hash = hashlib.file_digest(src, "sha256").hexdigest()
+        else:
+            file_hasher = hashlib.sha256()
+            for chunk in iter(lambda: src.read(UPLOAD_CHUNK_SIZE), b""):
+                file_hasher.update(chunk)
+            file_hash = file_hasher.hexdigest()
+    
+    # Let the kernel copy the bytes between the two files
+    with open(file_path, "wb") as dst:
+        offset = 0
+        while offset < file_size:
+            sent = os.sendfile(dst.fileno(), src_fd, offset, file_size - offset)
+            if sent == 0:
+                break
+            offset += sent
+    return file_size, file_hash
+
+async def stream_upload(file: UploadFile, file_path: str) -> tuple:
+    """Stream an upload to disk in chunks, returning its size and hash"""
+    file_hasher = hashlib.sha256()
+    file_size = 0
+    async with aiofiles.open(file_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            if file_size > MAX_FILE_SIZE:
+                break
+            file_hasher.update(chunk)
+            await f.write(chunk)
+    return file_size, file_hasher.hexdigest()
+
+def remove_upload(file_path: str) -> None:
+    """Delete an upload written to disk, if it was"""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+async def read_upload(file: UploadFile) -> tuple:
+    """Read an upload into 1 MiB chunks, returning its size, hash and chunks"""
+    file_hasher = hashlib.sha256()
+    file_size = 0
+    chunks = []
+    while chunk := await file.read(UPLOAD_BLOB_CHUNK_SIZE):
+        file_size += len(chunk)
+        if file_size > MAX_FILE_SIZE:
+            break
+        file_hasher.update(chunk)
+        chunks.append(chunk)
+    return file_size, file_hasher.hexdigest(), chunks
+
+async def store_upload_blob(blob_key: str, chunks: list) -> None:
+    """Push upload chunks to a Redis list that expires if no worker claims it"""
+    async with redis_cache.pipeline(transaction=False) as pipe:
+        pipe.rpush(blob_key, *(chunks or [b""]))
+        pipe.expire(blob_key, UPLOAD_BLOB_TTL_SECONDS)
+        await pipe.execute()
+
+# Static root payload, serialized once at import
+_ROOT_BYTES = orjson.dumps({
+    "message": "Financial Document Analyzer API v2.0 is running",
+    "version": "2.0.0",
+    "status": "healthy",
+    "features": {
+        "queue_processing": "Redis + Celery",
+        "database": "PostgreSQL + SQLAlchemy",
+        "caching": "Intelligent result caching",
+        "concurrent_requests": "Supported"
+    },
+    "endpoints": {
+        "analyze": "/analyze - POST - Upload and analyze financial documents (async)",
+        "status": "/status/{job_id} - GET - Check analysis status",
+        "status_batch": "/status?job_ids=a,b,c - GET - Check several analyses at once",
+        "result": "/result/{job_id} - GET - Get analysis results",
+        "stream": "/stream/{job_id} - GET - Stream agent outputs as server-sent events",
+        "health": "/health - GET - Detailed health check",
+        "stats": "/stats - GET - System statistics"
+    }
+})
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    return {
-        "message": "Financial Document Analyzer API v2.0 is running",
-        "version": "2.0.0",
-        "status": "healthy",
-        "features": {
-            "queue_processing": "Redis + Celery",
-            "database": "PostgreSQL + SQLAlchemy",
-            "caching": "Intelligent result caching",
-            "concurrent_requests": "Supported"
-        },
-        "endpoints": {
-            "analyze": "/analyze - POST - Upload and analyze financial documents (async)",
-            "status": "/status/{job_id} - GET - Check analysis status",
-            "result": "/result/{job_id} - GET - Get analysis results",
-            "health": "/health - GET - Detailed health check",
-            "stats": "/stats - GET - System statistics"
-        }
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
+
+def count_stored_results() -> tuple:
+    """Count stored analyses and cache entries"""
+    with read_connection() as conn:
+        total_analyses = conn.scalar(select(func.count()).select_from(AnalysisResult))
+        cached_results = conn.scalar(select(func.count()).select_from(AnalysisCache))
+    return total_analyses, cached_results
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+@ttl_cached()
+async def health_check():
     """Detailed health check endpoint with database connectivity"""
     try:
         # Test database connection
-        total_analyses = db.query(AnalysisResult).count()
-        cached_results = db.query(AnalysisCache).count()
+        total_analyses, cached_results = await asyncio.to_thread(count_stored_results)
         
         return {
             "status": "healthy",
@@ -77,7 +348,7 @@ async def health_check(db: Session = Depends(get_db)):
             }
         }
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=503,
             content={
                 "status": "unhealthy",
@@ -87,6 +358,7 @@ async def health_check(db: Session = Depends(get_db)):
 
 @app.post("/analyze")
 async def analyze_document(
+    request: Request,
     file: UploadFile = File(..., description="Financial document to analyze (PDF format)"),
     query: str = Form(
         default="Provide a comprehensive analysis of this financial document including investment insights and risk assessment",
@@ -100,72 +372,121 @@ async def analyze_document(
     Returns job_id for status tracking instead of blocking until completion
     """
     
-    # Validate file type
-    if not file.filename.lower().endswith('.pdf'):
+    # Validate file type and declared size before copying anything
+    if file.content_type != "application/pdf" and not file.filename.lower().endswith('.pdf'):
         raise HTTPException(
             status_code=400, 
             detail="Only PDF files are supported. Please upload a PDF financial document."
         )
+    # A malformed Content-Length is ignored; the copy below still enforces the limit
+    content_length = request.headers.get("content-length", "")
+    declared_size = file.size if file.size is not None else (int(content_length) if content_length.isdigit() else 0)
+    if declared_size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail="File too large. Maximum size is 10MB."
+        )
     
     # Generate unique file ID and path
     file_id = str(uuid.uuid4())
     file_path = f"data/financial_document_{file_id}.pdf"
     
     try:
-        # Ensure data directory exists
-        os.makedirs("data", exist_ok=True)
+        # Copy the upload to disk (or memory), hashing and counting bytes on the way
+        blob_chunks = None
+        if UPLOAD_TRANSPORT == "redis":
+            file_size, file_hash, blob_chunks = await read_upload(file)
+        elif SENDFILE_SUPPORTED:
+            try:
+                file_size, file_hash = await asyncio.to_thread(sendfile_upload, file.file, file_path)
+            except OSError as e:
+                # e.g. filesystems without sendfile support; copy the slow way
+                print(f"sendfile copy failed, streaming upload instead: {e}")
+                await file.seek(0)
+                file_size, file_hash = await stream_upload(file, file_path)
+        else:
+            file_size, file_hash = await stream_upload(file, file_path)
         
         # Validate file size (10MB limit)
-        file_content = await file.read()
-        if len(file_content) > 10 * 1024 * 1024:  # 10MB
+        if file_size > MAX_FILE_SIZE:
+            remove_upload(file_path)
             raise HTTPException(
-                status_code=400,
+                status_code=413,
                 detail="File too large. Maximum size is 10MB."
             )
         
-        # Save uploaded file
-        with open(file_path, "wb") as f:
-            f.write(file_content)
-        
         # Validate and clean query
         if not query or query.strip() == "":
             query = "Provide a comprehensive analysis of this financial document including investment insights and risk assessment"
         
         query = query.strip()
-        file_size_mb = round(len(file_content) / (1024 * 1024), 2)
+        file_size_mb = round(file_size / (1024 * 1024), 2)
         
-        # Submit task to Celery queue
-        task = analyze_financial_document_task.delay(
-            file_path=file_path,
-            query=query,
-            filename=file.filename,
-            file_size_mb=file_size_mb
-        )
+        # Serve identical document + query pairs straight from the cache
+        query_hash = get_query_hash(query)
+        cached_analysis = await get_cached_analysis(db, file_hash, query_hash)
+        
+        if cached_analysis:
+            remove_upload(file_path)
+            return {
+                "status": "cache_hit",
+                "message": "Financial document analysis completed (from cache)",
+                "cached": True,
+                "query": query,
+                "file_info": {
+                    "filename": file.filename,
+                    "size_mb": file_size_mb
+                },
+                "analysis": {
+                    "summary": "Complete financial analysis including verification, metrics analysis, investment insights, and risk assessment",
+                    "result": cached_analysis["result"]
+                },
+                "agents_used": cached_analysis["agents_used"]
+            }
         
-        # Create database record
-        analysis_record = AnalysisResult(
-            job_id=task.id,
-            filename=file.filename,
-            file_size_mb=file_size_mb,
-            query=query,
-            status="queued"
+        # Publish the Celery task and hand the job record to the batch flusher;
+        # the worker creates the row itself if it gets there first
+        job_id = str(uuid.uuid4())
+        queued_at = utcnow()
+        task_kwargs = {
+            "file_path": file_path,
+            "query": query,
+            "filename": file.filename,
+            "file_size_mb": file_size_mb,
+            "file_sha256": file_hash,
+            "query_hash": query_hash
+        }
+        if blob_chunks is not None:
+            # The worker writes the document to its own file_path
+            task_kwargs["file_blob_key"] = get_upload_blob_key(file_id)
+            await store_upload_blob(task_kwargs["file_blob_key"], blob_chunks)
+        await asyncio.to_thread(
+            analyze_financial_document_task.apply_async,
+            kwargs=task_kwargs,
+            task_id=job_id
         )
-        db.add(analysis_record)
-        db.commit()
+        pending_records.put_nowait({
+            "job_id": job_id,
+            "filename": file.filename,
+            "file_size_mb": file_size_mb,
+            "query": query,
+            "status": "queued",
+            "created_at": queued_at
+        })
         
         return {
             "status": "accepted",
             "message": "Financial document analysis queued successfully",
-            "job_id": task.id,
+            "job_id": job_id,
             "query": query,
             "file_info": {
                 "filename": file.filename,
                 "size_mb": file_size_mb,
-                "queued_at": datetime.utcnow().isoformat()
+                "queued_at": queued_at
             },
             "next_steps": {
-                "check_status": f"/status/{task.id}",
-                "get_result": f"/result/{task.id}"
+                "check_status": f"/status/{job_id}",
+                "get_result": f"/result/{job_id}"
             }
         }
         
@@ -186,60 +507,192 @@ async def analyze_document(
             }
         )
 
-@app.get("/status/{job_id}")
-async def get_analysis_status(job_id: str, db: Session = Depends(get_db)):
-    """Get the status of a financial analysis job"""
-    
-    # Check database record
-    analysis_record = db.query(AnalysisResult).filter(AnalysisResult.job_id == job_id).first()
-    if not analysis_record:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    # Get Celery task status
-    task = AsyncResult(job_id)
-    
+async def get_task_states(job_ids: List[str]) -> dict:
+    """Return Celery state and info per job, reading the result backend keys in one pipeline"""
+    task_states = {}
+    try:
+        async with redis_cache.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.get(f"celery-task-meta-{job_id}")
+            task_metas = await pipe.execute()
+        for job_id, task_meta in zip(job_ids, task_metas):
+            if task_meta:
+                task_meta = json.loads(task_meta)
+                task_states[job_id] = (task_meta["status"], task_meta.get("result"))
+            else:
+                # Celery writes no meta key until a worker starts the task,
+                # which is exactly what AsyncResult would report as PENDING
+                task_states[job_id] = ("PENDING", None)
+    except Exception as e:
+        print(f"Celery state lookup failed: {e}")
+        # Fall back to the Celery API only when the direct read itself failed
+        for job_id in job_ids:
+            task = AsyncResult(job_id)
+            task_states[job_id] = await asyncio.to_thread(lambda: (task.state, task.info))
+    return task_states
+
+def load_job_records(conn: Connection, job_ids: List[str]) -> dict:
+    """Fetch the status columns of several job records in one query"""
+    rows = conn.execute(
+        select(
+            AnalysisResult.job_id,
+            AnalysisResult.status,
+            AnalysisResult.filename,
+            AnalysisResult.query,
+            AnalysisResult.created_at,
+            AnalysisResult.completed_at,
+            AnalysisResult.processing_time_seconds,
+            AnalysisResult.error_message
+        ).where(AnalysisResult.job_id.in_(job_ids))
+    ).all()
+    return {row.job_id: row for row in rows}
+
+def build_status_info(job_id: str, analysis_record, task_state: str, task_info) -> dict:
+    """Describe a job's progress from its record and Celery state"""
     status_info = {
         "job_id": job_id,
-        "status": task.state,
+        "status": task_state,
         "filename": analysis_record.filename,
         "query": analysis_record.query,
-        "created_at": analysis_record.created_at.isoformat(),
+        "created_at": analysis_record.created_at,
     }
     
-    if task.state == "PENDING":
+    if task_state == "PENDING":
         status_info.update({
             "message": "Analysis is queued and waiting to be processed",
             "progress": 0
         })
-    elif task.state == "PROCESSING":
+    elif task_state == "PROCESSING":
         status_info.update({
-            "message": task.info.get("status", "Processing..."),
-            "progress": task.info.get("progress", 0)
+            "message": task_info.get("status", "Processing..."),
+            "progress": task_info.get("progress", 0)
         })
-    elif task.state == "SUCCESS":
+    elif task_state == "SUCCESS":
         status_info.update({
             "message": "Analysis completed successfully",
             "progress": 100,
-            "completed_at": analysis_record.completed_at.isoformat() if analysis_record.completed_at else None,
+            "completed_at": analysis_record.completed_at,
             "processing_time": analysis_record.processing_time_seconds,
             "result_available": True
         })
-    elif task.state == "FAILURE":
+    elif task_state == "FAILURE":
         status_info.update({
             "message": "Analysis failed",
             "progress": 0,
-            "error": str(task.info) if task.info else analysis_record.error_message,
-            "completed_at": analysis_record.completed_at.isoformat() if analysis_record.completed_at else None
+            "error": analysis_record.error_message or str(task_info),
+            "completed_at": analysis_record.completed_at
         })
     
     return status_info
 
+async def collect_job_statuses(conn: Connection, job_ids: List[str]) -> dict:
+    """Build status info for each known job, keyed by job ID"""
+    analysis_records = await asyncio.to_thread(load_job_records, conn, job_ids)
+    
+    # The worker mirrors terminal states into the job record, so only
+    # unfinished jobs need a Celery state lookup
+    task_states = {}
+    unfinished_jobs = []
+    for job_id, analysis_record in analysis_records.items():
+        if analysis_record.status == "completed":
+            task_states[job_id] = ("SUCCESS", None)
+        elif analysis_record.status == "failed":
+            task_states[job_id] = ("FAILURE", None)
+        else:
+            unfinished_jobs.append(job_id)
+    if unfinished_jobs:
+        task_states.update(await get_task_states(unfinished_jobs))
+    
+    return {
+        job_id: build_status_info(job_id, analysis_record, *task_states[job_id])
+        for job_id, analysis_record in analysis_records.items()
+    }
+
+@app.get("/status")
+async def get_analysis_statuses(
+    job_ids: List[str] = Query(..., description="Job IDs to check, repeated or comma-separated"),
+    conn: Connection = Depends(get_read_conn)
+):
+    """Get the status of several financial analysis jobs at once"""
+    
+    # Accept both ?job_ids=a&job_ids=b and ?job_ids=a,b
+    requested_ids = list(dict.fromkeys(
+        job_id.strip() for value in job_ids for job_id in value.split(",") if job_id.strip()
+    ))
+    if len(requested_ids) > MAX_STATUS_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_STATUS_BATCH} job IDs can be checked per request"
+        )
+    
+    job_statuses = await collect_job_statuses(conn, requested_ids)
+    return {
+        "jobs": [job_statuses[job_id] for job_id in requested_ids if job_id in job_statuses],
+        "not_found": [job_id for job_id in requested_ids if job_id not in job_statuses]
+    }
+
+@app.get("/status/{job_id}")
+async def get_analysis_status(job_id: str, conn: Connection = Depends(get_read_conn)):
+    """Get the status of a financial analysis job"""
+    
+    job_statuses = await collect_job_statuses(conn, [job_id])
+    if job_id not in job_statuses:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job_statuses[job_id]
+
+def get_job_status(job_id: str) -> Optional[str]:
+    """Read the current status of an analysis job from the database"""
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(AnalysisResult.status).where(AnalysisResult.job_id == job_id)
+        ).scalar_one_or_none()
+    finally:
+        db.close()
+
+@app.get("/stream/{job_id}")
+async def stream_analysis(job_id: str):
+    """Stream agent outputs of a running analysis as server-sent events"""
+    
+    if await asyncio.to_thread(get_job_status, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        pubsub = redis_cache.pubsub()
+        await pubsub.subscribe(get_stream_channel(job_id))
+        try:
+            # The job may have finished before we subscribed
+            status = await asyncio.to_thread(get_job_status, job_id)
+            if status in ("completed", "failed"):
+                payload = json.dumps({"event": status, "result_available": status == "completed"})
+                yield f"event: {status}\ndata: {payload}\n\n"
+                return
+            
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                
+                payload = message["data"].decode()
+                event = json.loads(payload)["event"]
+                yield f"event: {event}\ndata: {payload}\n\n"
+                
+                if event in ("completed", "failed"):
+                    break
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/result/{job_id}")
 async def get_analysis_result(job_id: str, db: Session = Depends(get_db)):
     """Get the results of a completed financial analysis"""
     
     # Check database record
-    analysis_record = db.query(AnalysisResult).filter(AnalysisResult.job_id == job_id).first()
+    analysis_record = db.execute(
+        select(AnalysisResult).where(AnalysisResult.job_id == job_id)
+    ).scalar_one_or_none()
     if not analysis_record:
         raise HTTPException(status_code=404, detail="Job not found")
     
@@ -257,7 +710,7 @@ async def get_analysis_result(job_id: str, db: Session = Depends(get_db)):
         "file_info": {
             "filename": analysis_record.filename,
             "size_mb": analysis_record.file_size_mb,
-            "processed_at": analysis_record.created_at.isoformat()
+            "processed_at": analysis_record.created_at
         },
         "analysis": {
             "summary": "Complete financial analysis including verification, metrics analysis, investment insights, and risk assessment",
@@ -265,34 +718,47 @@ async def get_analysis_result(job_id: str, db: Session = Depends(get_db)):
         },
         "agents_used": analysis_record.agents_used,
         "processing_info": {
-            "completed_at": analysis_record.completed_at.isoformat(),
+            "completed_at": analysis_record.completed_at,
             "processing_time_seconds": analysis_record.processing_time_seconds
         }
     }
 
+def load_system_stats() -> tuple:
+    """Read per-status job counts and aggregate cache statistics"""
+    with read_connection() as conn:
+        # Per-status counts precomputed by the analysis_stats materialized view
+        status_rows = conn.execute(
+            text("SELECT status, n, timed_n, total_t FROM analysis_stats")
+        ).all()
+        
+        # Cache statistics
+        cache_stats = conn.execute(
+            select(
+                func.count().label("cached_results"),
+                func.coalesce(func.sum(AnalysisCache.access_count), 0).label("total_cache_hits")
+            ).select_from(AnalysisCache)
+        ).one()
+    return status_rows, cache_stats
+
 @app.get("/stats")
-async def get_system_stats(db: Session = Depends(get_db)):
+@ttl_cached()
+async def get_system_stats():
     """Get system statistics and performance metrics"""
     
     try:
-        # Database statistics
-        total_analyses = db.query(AnalysisResult).count()
-        completed_analyses = db.query(AnalysisResult).filter(AnalysisResult.status == "completed").count()
-        failed_analyses = db.query(AnalysisResult).filter(AnalysisResult.status == "failed").count()
-        pending_analyses = db.query(AnalysisResult).filter(AnalysisResult.status.in_(["queued", "processing"])).count()
-        
-        # Cache statistics
-        cached_results = db.query(AnalysisCache).count()
-        total_cache_hits = db.query(AnalysisCache).with_entities(
-            db.func.sum(AnalysisCache.access_count)
-        ).scalar() or 0
+        status_rows, cache_stats = await asyncio.to_thread(load_system_stats)
         
-        # Performance statistics
-        avg_processing_time = db.query(AnalysisResult).filter(
-            AnalysisResult.processing_time_seconds.isnot(None)
-        ).with_entities(
-            db.func.avg(AnalysisResult.processing_time_seconds)
-        ).scalar()
+        status_counts = {row.status: row.n for row in status_rows}
+        total_analyses = sum(status_counts.values())
+        completed_analyses = status_counts.get("completed", 0)
+        failed_analyses = status_counts.get("failed", 0)
+        pending_analyses = status_counts.get("queued", 0) + status_counts.get("processing", 0)
+        timed_analyses = sum(row.timed_n for row in status_rows)
+        avg_processing_time = (
+            sum(row.total_t or 0 for row in status_rows) / timed_analyses if timed_analyses else None
+        )
+        cached_results = cache_stats.cached_results
+        total_cache_hits = cache_stats.total_cache_hits
         
         return {
             "system_status": "operational",
@@ -314,7 +780,7 @@ async def get_system_stats(db: Session = Depends(get_db)):
         }
         
     except Exception as e:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={"error": f"Failed to retrieve statistics: {str(e)}"}
         )
@@ -328,11 +794,18 @@ if __name__ == "__main__":
         print("API documentation at: http://localhost:8000/docs")
         print("System statistics at: http://localhost:8000/stats")
         
+        # Multiple workers need an import string so each process loads its own app
+        workers = int(os.getenv("API_WORKERS", (os.cpu_count() or 1) * 2))
+        print(f"Worker processes: {workers}")
+        
         uvicorn.run(
-            app, 
+            "main:app", 
             host="0.0.0.0", 
             port=8000, 
             reload=False,
+            workers=workers,
+            loop="auto",  # uvloop when installed (not available on Windows)
+            http="auto",  # httptools when installed
             log_level="info"
         )
     except Exception as e:
@@ -0,0 +1,34 @@
+"""Fixed-width cache hashes with a composite (file_hash, query_hash) index
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Entries without both hashes can never be looked up
+    op.execute("DELETE FROM analysis_cache WHERE file_hash IS NULL OR query_hash IS NULL")
+    
+    op.drop_index("ix_analysis_cache_query_hash", table_name="analysis_cache")
+    op.drop_index("ix_analysis_cache_file_hash", table_name="analysis_cache")
+    
+    op.alter_column("analysis_cache", "file_hash", type_=sa.String(64), existing_type=sa.String(), nullable=False)
+    op.alter_column("analysis_cache", "query_hash", type_=sa.String(64), existing_type=sa.String(), nullable=False)
+    
+    op.create_index("ix_cache_file_query", "analysis_cache", ["file_hash", "query_hash"], unique=True)
+
+def downgrade():
+    op.drop_index("ix_cache_file_query", table_name="analysis_cache")
+    
+    op.alter_column("analysis_cache", "query_hash", type_=sa.String(), existing_type=sa.String(64), nullable=True)
+    op.alter_column("analysis_cache", "file_hash", type_=sa.String(), existing_type=sa.String(64), nullable=True)
+    
+    op.create_index("ix_analysis_cache_file_hash", "analysis_cache", ["file_hash"], unique=True)
+    op.create_index("ix_analysis_cache_query_hash", "analysis_cache", ["query_hash"])
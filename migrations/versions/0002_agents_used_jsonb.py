@@ -0,0 +1,20 @@
+"""Store analysis_results.agents_used as JSONB with a GIN index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("ALTER TABLE analysis_results ALTER COLUMN agents_used TYPE jsonb USING agents_used::jsonb")
+    op.create_index("ix_analysis_agents_gin", "analysis_results", ["agents_used"], postgresql_using="gin")
+
+def downgrade():
+    op.drop_index("ix_analysis_agents_gin", table_name="analysis_results")
+    op.execute("ALTER TABLE analysis_results ALTER COLUMN agents_used TYPE json USING agents_used::json")
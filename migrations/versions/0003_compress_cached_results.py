@@ -0,0 +1,21 @@
+"""Store cached analysis reports zlib-compressed
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Cached reports are reproducible, so drop them rather than recompress in SQL
+    op.execute("DELETE FROM analysis_cache")
+    op.execute("ALTER TABLE analysis_cache ALTER COLUMN analysis_result TYPE bytea USING NULL")
+
+def downgrade():
+    op.execute("DELETE FROM analysis_cache")
+    op.execute("ALTER TABLE analysis_cache ALTER COLUMN analysis_result TYPE text USING NULL")
@@ -0,0 +1,24 @@
+"""Partial index over pending analysis jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        "ix_analysis_result_pending",
+        "analysis_results",
+        ["status"],
+        postgresql_where=sa.text("status IN ('queued', 'processing')")
+    )
+
+def downgrade():
+    op.drop_index("ix_analysis_result_pending", table_name="analysis_results")
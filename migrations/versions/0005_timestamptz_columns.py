@@ -0,0 +1,40 @@
+"""Store timestamps as timestamptz
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# Existing naive values were written with datetime.utcnow()
+TIMESTAMP_COLUMNS = {
+    "analysis_results": ["created_at", "completed_at"],
+    "users": ["created_at", "last_activity"],
+    "analysis_cache": ["created_at", "last_accessed"],
+}
+
+def upgrade():
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table,
+                column,
+                type_=sa.DateTime(timezone=True),
+                postgresql_using=f"{column} AT TIME ZONE 'UTC'"
+            )
+
+def downgrade():
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        for column in columns:
+            op.alter_column(
+                table,
+                column,
+                type_=sa.DateTime(),
+                postgresql_using=f"{column} AT TIME ZONE 'UTC'"
+            )
@@ -0,0 +1,65 @@
+"""Store job status as an enum and add the analysis_stats materialized view
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-15
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from database import ANALYSIS_STATS_VIEW_SQL, ANALYSIS_STATS_INDEX_SQL
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+analysis_status = sa.Enum("queued", "processing", "completed", "failed", name="analysis_status")
+
+def upgrade():
+    # Indexes on status are rebuilt against the new type
+    op.drop_index("ix_analysis_result_pending", table_name="analysis_results")
+    # Only databases built by create_all have this index; no earlier revision creates it
+    op.execute("DROP INDEX IF EXISTS ix_analysis_status_created")
+    
+    analysis_status.create(op.get_bind())
+    # Rows still carrying the old "pending" default were never picked up
+    op.alter_column(
+        "analysis_results",
+        "status",
+        type_=analysis_status,
+        postgresql_using="(CASE WHEN status = 'pending' THEN 'queued' ELSE status END)::analysis_status"
+    )
+    
+    op.create_index("ix_analysis_status_created", "analysis_results", ["status", "created_at"])
+    op.create_index(
+        "ix_analysis_result_pending",
+        "analysis_results",
+        ["status"],
+        postgresql_where=sa.text("status IN ('queued', 'processing')")
+    )
+    
+    op.execute(ANALYSIS_STATS_VIEW_SQL)
+    op.execute(ANALYSIS_STATS_INDEX_SQL)
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS analysis_stats")
+    
+    op.drop_index("ix_analysis_result_pending", table_name="analysis_results")
+    op.drop_index("ix_analysis_status_created", table_name="analysis_results")
+    
+    op.alter_column(
+        "analysis_results",
+        "status",
+        type_=sa.String(),
+        postgresql_using="status::text"
+    )
+    analysis_status.drop(op.get_bind())
+    
+    op.create_index("ix_analysis_status_created", "analysis_results", ["status", "created_at"])
+    op.create_index(
+        "ix_analysis_result_pending",
+        "analysis_results",
+        ["status"],
+        postgresql_where=sa.text("status IN ('queued', 'processing')")
+    )
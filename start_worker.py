@@ -2,6 +2,14 @@
 """
 Start Celery worker for background task processing
 """
+# Patch blocking I/O for green threads before anything opens sockets
+import eventlet
+eventlet.monkey_patch()
+# psycopg2 is a C driver that monkey_patch can't reach; without this every
+# database call blocks all green threads in the process
+from psycogreen.eventlet import patch_psycopg
+patch_psycopg()
+
 import os
 import sys
 from celery_app import celery_app
@@ -11,6 +19,7 @@ if __name__ == "__main__":
     print("📋 Available tasks:")
     print("   - analyze_financial_document_task")
     print("   - cleanup_old_cache_entries")
+    print("   - refresh_analysis_stats (scheduled by: celery -A celery_app beat)")
     print("🔄 Worker will process tasks from Redis queue")
     print("📊 Monitor with Flower: celery -A celery_app flower")
     print("⏹️  Stop with Ctrl+C")
@@ -20,6 +29,7 @@ if __name__ == "__main__":
     celery_app.worker_main([
         'worker',
         '--loglevel=info',
-        '--concurrency=1',  # Process 1 task at a time
-        '--pool=solo',      # Use solo pool for Windows compatibility
+        '--pool=eventlet',   # Green threads: tasks spend most of their time waiting on LLM/search APIs
+        '--concurrency=18',  # Tasks in flight per worker process
+        '-Q', 'analysis,celery',  # I/O-bound analysis queue plus the default queue
     ])
\ No newline at end of file
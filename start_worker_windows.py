@@ -2,6 +2,14 @@
 """
 Start Celery worker for Windows with proper configuration
 """
+# Patch blocking I/O for greenlets before anything opens sockets
+from gevent import monkey
+monkey.patch_all()
+# psycopg2 is a C driver that patch_all can't reach; without this every
+# database call blocks all greenlets in the process
+from psycogreen.gevent import patch_psycopg
+patch_psycopg()
+
 import os
 import sys
 
@@ -15,6 +23,7 @@ if __name__ == "__main__":
     print("📋 Available tasks:")
     print("   - analyze_financial_document_task")
     print("   - cleanup_old_cache_entries")
+    print("   - refresh_analysis_stats (scheduled by: celery -A celery_app beat)")
     print("🔄 Worker will process tasks from Redis queue")
     print("📊 Monitor with Flower: celery -A celery_app flower")
     print("⏹️  Stop with Ctrl+C")
@@ -24,6 +33,7 @@ if __name__ == "__main__":
     celery_app.worker_main([
         'worker',
         '--loglevel=info',
-        '--pool=solo',      # Solo pool for Windows
-        '--concurrency=1',  # Single worker
+        '--pool=gevent',     # Gevent pool works on Windows (prefork and eventlet do not)
+        '--concurrency=50',  # Tasks in flight per worker process
+        '-Q', 'analysis,celery',  # I/O-bound analysis queue plus the default queue
     ])
\ No newline at end of file
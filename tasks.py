@@ -2,32 +2,272 @@
 Background tasks for financial document analysis using Celery
 """
 import os
+import json
+import mmap
+import time
 import hashlib
-from datetime import datetime
-from typing import Dict, Any
+import functools
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional, Sequence, Tuple
+import redis
 from celery import current_task
+from celery.signals import worker_process_init
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from celery_app import celery_app
-from database import SessionLocal, AnalysisResult, AnalysisCache
+from celery_app import celery_app, REDIS_URL
+from database import utcnow, engine, ScopedSession, AnalysisResult, AnalysisCache, compress_text, decompress_text
 from crewai import Crew, Process
-from agents import financial_analyst, verifier, investment_advisor, risk_assessor
-from task import analyze_financial_document, investment_analysis, risk_assessment, verification
+from agents import create_agents, CREW_VERBOSE
+from task import create_tasks
+
+# Redis cache tier in front of the PostgreSQL analysis_cache table
+CACHE_TTL_SECONDS = 24 * 60 * 60
+INFLIGHT_LOCK_SECONDS = 10 * 60
+redis_client = redis.Redis.from_url(REDIS_URL)
+
+# Agents credited on every completed analysis (serialized as a JSON list)
+AGENTS_USED = (
+    "Document Verifier - Validated document authenticity",
+    "Financial Analyst - Analyzed financial metrics and trends",
+    "Investment Advisor - Provided investment recommendations",
+    "Risk Assessor - Conducted comprehensive risk analysis"
+)
+
+# Only the verifier runs on documents it rejects
+VERIFIER_ONLY = AGENTS_USED[:1]
+
+# Verdict line the verification task ends its report with
+VERIFICATION_RESULT = re.compile(r"VERIFICATION RESULT:\s*(VALID|INVALID)", re.IGNORECASE)
+
+# Read size for hashing files that cannot be memory-mapped
+HASH_CHUNK_SIZE = 1 << 20
+
+@worker_process_init.connect
+def reset_worker_process(**kwargs):
+    """Drop database connections inherited by a forked prefork child"""
+    # Connections inherited from the parent must not be shared across the fork
+    engine.dispose(close=False)
 
 def get_file_hash(file_path: str) -> str:
     """Generate SHA256 hash of file content for caching"""
     hash_sha256 = hashlib.sha256()
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_sha256.update(chunk)
+        try:
+            # Hash the mapped pages directly instead of copying them into bytes
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                hash_sha256.update(mm)
+        except (ValueError, OSError, OverflowError):
+            # Empty files, some FUSE mounts and files too large for a 32-bit
+            # address space cannot be memory-mapped
+            if hasattr(hashlib, "file_digest"):
+                # Python 3.11+ runs the read loop in C
+                return hashlib.file_digest(f, "sha256").hexdigest()
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                hash_sha256.update(chunk)
     return hash_sha256.hexdigest()
 
+@functools.lru_cache(maxsize=4096)
 def get_query_hash(query: str) -> str:
     """Generate hash of query for cache key"""
-    return hashlib.sha256(query.encode()).hexdigest()
+    # A cache key, not a security token
+    return hashlib.sha256(query.encode(), usedforsecurity=False).hexdigest()
+
+def get_cache_key(file_hash: str, query_hash: str) -> str:
+    """Build the Redis key for a cached analysis"""
+    return f"analysis_cache:{file_hash}:{query_hash}"
+
+def get_upload_blob_key(file_id: str) -> str:
+    """Build the Redis key holding an upload passed through Redis"""
+    return f"upload:{file_id}"
+
+def fetch_upload_blob(blob_key: str, file_path: str) -> None:
+    """Write an upload the API stored in Redis to a local file for the crew to read"""
+    chunks = redis_client.lrange(blob_key, 0, -1)
+    if not chunks:
+        raise FileNotFoundError(f"Uploaded document {blob_key} is missing or expired")
+    
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.writelines(chunks)
+
+def store_cached_analysis(file_hash: str, query_hash: str, analysis_result: str, agents_used: Sequence[str]) -> None:
+    """Write an analysis to the Redis cache in a single round-trip"""
+    payload = compress_text(json.dumps({"result": analysis_result, "agents_used": agents_used}))
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.setex(get_cache_key(file_hash, query_hash), CACHE_TTL_SECONDS, payload)
+        pipe.hincrby("cache_stats", "writes", 1)
+        pipe.execute()
+
+def get_inflight_lock_key(file_hash: str, query_hash: str) -> str:
+    """Build the Redis key marking an analysis as in progress"""
+    return f"inflight:{file_hash}:{query_hash}"
+
+def publish_inflight_result(lock_key: str, analysis_result: str, agents_used: Sequence[str]) -> None:
+    """Hand the finished analysis to workers waiting on the same lock"""
+    payload = json.dumps({"result": analysis_result, "agents_used": agents_used})
+    redis_client.publish(f"done:{lock_key}", payload)
+
+def release_inflight_lock(lock_key: str, job_id: str) -> None:
+    """Release an in-flight lock if this job still holds it"""
+    if redis_client.get(lock_key) == job_id.encode():
+        redis_client.delete(lock_key)
+
+def wait_for_inflight_analysis(file_hash: str, query_hash: str, timeout: float = INFLIGHT_LOCK_SECONDS) -> Optional[Dict[str, Any]]:
+    """
+    Wait for another worker that is analyzing the same document and query
+    
+    Returns:
+        The shared analysis, or None if the other worker gave up or failed
+    """
+    lock_key = get_inflight_lock_key(file_hash, query_hash)
+    cache_key = get_cache_key(file_hash, query_hash)
+    
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(f"done:{lock_key}")
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            # The leader may have finished before we subscribed
+            cached_payload = redis_client.get(cache_key)
+            if cached_payload:
+                return json.loads(decompress_text(cached_payload))
+            if not redis_client.exists(lock_key):
+                return None
+            
+            message = pubsub.get_message(timeout=5.0)
+            if message:
+                return json.loads(message["data"])
+        return None
+    finally:
+        pubsub.close()
+
+def build_cache_upsert(file_hash: str, filename: str, query_hash: str, analysis_result: str, agents_used: Sequence[str]):
+    """Build an idempotent INSERT ... ON CONFLICT statement for a cache entry"""
+    cache_table = AnalysisCache.__table__
+    # The unique (file_hash, query_hash) index is the conflict target
+    stmt = pg_insert(cache_table).values(
+        file_hash=file_hash,
+        filename=filename,
+        query_hash=query_hash,
+        analysis_result=compress_text(analysis_result),
+        agents_used=agents_used
+    )
+    # A concurrent job already cached this document: just record the access
+    return stmt.on_conflict_do_update(
+        index_elements=["file_hash", "query_hash"],
+        set_={
+            "access_count": cache_table.c.access_count + 1,
+            "last_accessed": stmt.excluded.last_accessed
+        }
+    )
+
+def get_stream_channel(job_id: str) -> str:
+    """Build the Redis pub/sub channel carrying a job's stream events"""
+    return f"analysis_stream:{job_id}"
+
+def publish_stream_event(job_id: str, event: str, data: Dict[str, Any]) -> None:
+    """Publish an event for clients following /stream/{job_id}"""
+    try:
+        redis_client.publish(get_stream_channel(job_id), json.dumps({"event": event, **data}))
+    except Exception as e:
+        print(f"Stream event publish failed: {e}")
+
+def run_financial_analysis_crew(query: str, file_path: str, task_callback: Optional[Callable] = None) -> Tuple[str, bool]:
+    """
+    Run the CrewAI agents over a financial document
+    
+    Verification runs first, and documents it rejects skip the remaining
+    agents. Financial analysis follows; the investment and risk tasks only
+    depend on it, so their crews are kicked off concurrently once it has
+    finished.
+    
+    Args:
+        query: User's analysis query
+        file_path: Path to the uploaded PDF file
+        task_callback: Called with each task's output as soon as it completes
+        
+    Returns:
+        Tuple of the output text and whether the document passed
+        verification: the combined investment and risk analysis, or the
+        verifier's rejection report
+    """
+    inputs = {
+        'query': query,
+        'file_path': file_path
+    }
+    
+    # CrewAI mutates agents and tasks while running them, so each job gets its own
+    agents = create_agents()
+    tasks = create_tasks(agents)
+    
+    # Stage 1: Verify the document before paying for the other agents
+    verification_crew = Crew(
+        agents=[agents["verifier"]],
+        tasks=[tasks["verification"]],
+        process=Process.sequential,
+        verbose=CREW_VERBOSE,
+        task_callback=task_callback
+    )
+    verification_result = verification_crew.kickoff(inputs)
+    
+    verdict = VERIFICATION_RESULT.findall(verification_result.raw)
+    if verdict and verdict[-1].upper() == "INVALID":
+        return (
+            "Document verification failed: the uploaded file does not appear to be "
+            "a financial document suitable for analysis.\n\n"
+            f"{verification_result.raw}"
+        ), False
+    
+    # Stage 2: Analyze the document's financials
+    analysis_crew = Crew(
+        agents=[agents["financial_analyst"]],
+        tasks=[tasks["analyze_financial_document"]],
+        process=Process.sequential,
+        verbose=CREW_VERBOSE,
+        task_callback=task_callback
+    )
+    analysis_crew.kickoff(inputs)
+    
+    # Stage 3: Investment and risk analysis are independent of each other
+    advisor_crew = Crew(
+        agents=[agents["investment_advisor"]],
+        tasks=[tasks["investment_analysis"]],
+        process=Process.sequential,
+        verbose=CREW_VERBOSE,
+        task_callback=task_callback
+    )
+    risk_crew = Crew(
+        agents=[agents["risk_assessor"]],
+        tasks=[tasks["risk_assessment"]],
+        process=Process.sequential,
+        verbose=CREW_VERBOSE,
+        task_callback=task_callback
+    )
+    
+    # Plain threads rather than asyncio.run: a fresh event loop per task does not
+    # cooperate with the eventlet/gevent hub, while patched threads do
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        investment_future = executor.submit(advisor_crew.kickoff, inputs)
+        risk_future = executor.submit(risk_crew.kickoff, inputs)
+        investment_result = investment_future.result()
+        risk_result = risk_future.result()
+    
+    return f"{investment_result.raw}\n\n{risk_result.raw}", True
 
 @celery_app.task(bind=True)
-def analyze_financial_document_task(self, file_path: str, query: str, filename: str, file_size_mb: float) -> Dict[str, Any]:
+def analyze_financial_document_task(
+    self,
+    file_path: str,
+    query: str,
+    filename: str,
+    file_size_mb: float,
+    file_blob_key: Optional[str] = None,
+    file_sha256: Optional[str] = None,
+    query_hash: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Background task to analyze financial documents using CrewAI
     
@@ -36,20 +276,21 @@ def analyze_financial_document_task(self, file_path: str, query: str, filename:
         query: User's analysis query
         filename: Original filename
         file_size_mb: File size in MB
+        file_blob_key: Redis key holding the upload when the API didn't write it to disk
+        file_sha256: SHA256 of the upload, computed while the API received it
+        query_hash: Hash of the query, as computed by get_query_hash
         
     Returns:
         Dict containing analysis results
     """
-    # Try to create database session, but continue without it if it fails
-    db = None
-    try:
-        db = SessionLocal()
-    except Exception as e:
-        print(f"Database connection failed, continuing without database: {e}")
-        db = None
+    # Borrow this worker's scoped session; it connects lazily from the pool
+    db = ScopedSession()
     
     job_id = self.request.id
-    start_time = datetime.utcnow()
+    start_time = time.monotonic()  # for durations; completed_at uses wall-clock time
+    inflight_lock = None
+    analysis_record = None  # read by the error handler, even if setup fails
+    file_hash = None  # set by the cache check; query_hash may arrive precomputed
     
     try:
         # Update task status to processing
@@ -58,160 +299,221 @@ def analyze_financial_document_task(self, file_path: str, query: str, filename:
             meta={"status": "Starting financial analysis...", "progress": 0}
         )
         
-        # Create or update database record (if database is available)
-        analysis_record = None
-        if db:
-            try:
-                analysis_record = db.query(AnalysisResult).filter(AnalysisResult.job_id == job_id).first()
-                if not analysis_record:
-                    analysis_record = AnalysisResult(
-                        job_id=job_id,
-                        filename=filename,
-                        file_size_mb=file_size_mb,
-                        query=query,
-                        status="processing"
-                    )
-                    db.add(analysis_record)
-                    db.commit()
-            except Exception as e:
-                print(f"Database record creation failed: {e}")
-                analysis_record = None
+        # Create or update the job record
+        try:
+            # The API inserts this row concurrently with queuing the task;
+            # either way, mark the job as processing. The record is committed
+            # together with the cache check's outcome below.
+            analysis_record = db.scalars(
+                pg_insert(AnalysisResult)
+                .values(
+                    job_id=job_id,
+                    filename=filename,
+                    file_size_mb=file_size_mb,
+                    query=query,
+                    status="processing"
+                )
+                .on_conflict_do_update(
+                    index_elements=["job_id"],
+                    set_={"status": "processing"}
+                )
+                .returning(AnalysisResult),
+                execution_options={"populate_existing": True}
+            ).one()
+        except Exception as e:
+            print(f"Database record creation failed: {e}")
+            db.rollback()
+            analysis_record = None
+        
+        # Materialize uploads passed through Redis as a local file; with the
+        # record loaded, an expired upload marks the job failed below
+        if file_blob_key:
+            fetch_upload_blob(file_blob_key, file_path)
         
-        # Check cache first (if database is available)
+        # Check cache first
         cached_result = None
-        if db:
-            try:
-                file_hash = get_file_hash(file_path)
-                query_hash = get_query_hash(query)
-                
+        try:
+            # The API hashes both while accepting the upload; older
+            # queued messages may not carry them
+            file_hash = file_sha256 or get_file_hash(file_path)
+            query_hash = query_hash or get_query_hash(query)
+            
+            cached_result = db.execute(
+                select(AnalysisCache).where(
+                    AnalysisCache.file_hash == file_hash,
+                    AnalysisCache.query_hash == query_hash
+                )
+            ).scalar_one_or_none()
+            
+            if cached_result:
+                # Return cached result
                 current_task.update_state(
                     state="PROCESSING",
-                    meta={"status": "Checking cache...", "progress": 10}
+                    meta={"status": "Found cached result, returning...", "progress": 100}
                 )
                 
-                cached_result = db.query(AnalysisCache).filter(
-                    AnalysisCache.file_hash == file_hash,
-                    AnalysisCache.query_hash == query_hash
-                ).first()
+                cached_text = decompress_text(cached_result.analysis_result)
+                cached_agents = cached_result.agents_used
+                
+                # Update cache access
+                cached_result.access_count += 1
+                cached_result.last_accessed = utcnow()
+                
+                # Update analysis record
+                if analysis_record:
+                    analysis_record.status = "completed"
+                    analysis_record.detailed_result = cached_text
+                    analysis_record.agents_used = cached_agents
+                    analysis_record.completed_at = utcnow()
+                    analysis_record.processing_time_seconds = 0.1  # Cached result
+                
+                db.commit()
                 
-                if cached_result:
-                    # Return cached result
+                publish_stream_event(job_id, "completed", {"cached": True, "result": cached_text})
+                
+                return {
+                    "status": "success",
+                    "message": "Analysis completed (from cache)",
+                    "cached": True,
+                    "result": cached_text,
+                    "agents_used": cached_agents
+                }
+        except Exception as e:
+            print(f"Cache check failed: {e}")
+            cached_result = None
+        
+        # Commit the processing status before the long-running stages so no
+        # transaction stays open while waiting on duplicates or the crew
+        try:
+            db.commit()
+        except Exception as e:
+            print(f"Database record update failed: {e}")
+            db.rollback()
+        
+        # Collapse concurrent duplicate analyses into a single crew run
+        if file_hash is not None and query_hash is not None:
+            try:
+                lock_key = get_inflight_lock_key(file_hash, query_hash)
+                if redis_client.set(lock_key, job_id, nx=True, ex=INFLIGHT_LOCK_SECONDS):
+                    inflight_lock = lock_key
+                else:
                     current_task.update_state(
                         state="PROCESSING",
-                        meta={"status": "Found cached result, returning...", "progress": 100}
+                        meta={"status": "Waiting for identical analysis in progress...", "progress": 20}
                     )
                     
-                    # Update cache access
-                    cached_result.access_count += 1
-                    cached_result.last_accessed = datetime.utcnow()
-                    
-                    # Update analysis record
-                    if analysis_record:
-                        analysis_record.status = "completed"
-                        analysis_record.detailed_result = cached_result.analysis_result
-                        analysis_record.agents_used = cached_result.agents_used
-                        analysis_record.completed_at = datetime.utcnow()
-                        analysis_record.processing_time_seconds = 0.1  # Cached result
-                    
-                    db.commit()
-                    
-                    return {
-                        "status": "success",
-                        "message": "Analysis completed (from cache)",
-                        "cached": True,
-                        "result": cached_result.analysis_result,
-                        "agents_used": cached_result.agents_used
-                    }
+                    shared_result = wait_for_inflight_analysis(file_hash, query_hash)
+                    if shared_result:
+                        if analysis_record:
+                            analysis_record.status = "completed"
+                            analysis_record.detailed_result = shared_result["result"]
+                            analysis_record.agents_used = shared_result["agents_used"]
+                            analysis_record.completed_at = utcnow()
+                            analysis_record.processing_time_seconds = time.monotonic() - start_time
+                            db.commit()
+                        
+                        publish_stream_event(job_id, "completed", {"cached": True, "result": shared_result["result"]})
+                        
+                        return {
+                            "status": "success",
+                            "message": "Analysis completed (shared with identical in-flight job)",
+                            "cached": True,
+                            "result": shared_result["result"],
+                            "agents_used": shared_result["agents_used"]
+                        }
             except Exception as e:
-                print(f"Cache check failed: {e}")
-                cached_result = None
+                print(f"In-flight deduplication failed: {e}")
         
         # Run CrewAI analysis
-        current_task.update_state(
-            state="PROCESSING",
-            meta={"status": "Running AI analysis...", "progress": 20}
-        )
-        
-        # Create the financial analysis crew
-        financial_crew = Crew(
-            agents=[
-                verifier,           # First: Verify document quality
-                financial_analyst,  # Second: Analyze financial data
-                investment_advisor, # Third: Provide investment insights
-                risk_assessor      # Fourth: Assess risks
-            ],
-            tasks=[
-                verification,              # Task 1: Verify document
-                analyze_financial_document, # Task 2: Analyze financials
-                investment_analysis,       # Task 3: Investment recommendations
-                risk_assessment           # Task 4: Risk analysis
-            ],
-            process=Process.sequential,
-            verbose=True
-        )
-        
         current_task.update_state(
             state="PROCESSING",
             meta={"status": "AI agents processing document...", "progress": 50}
         )
         
-        # Execute the crew
-        result = financial_crew.kickoff({
-            'query': query,
-            'file_path': file_path
-        })
-        
-        current_task.update_state(
-            state="PROCESSING",
-            meta={"status": "Finalizing results...", "progress": 90}
+        # Execute the crews
+        analysis_result, verified = run_financial_analysis_crew(
+            query,
+            file_path,
+            task_callback=lambda output: publish_stream_event(
+                job_id, "task_output", {"agent": output.agent, "output": output.raw}
+            )
         )
         
-        # Process results
-        analysis_result = str(result)
-        agents_used = [
-            "Document Verifier - Validated document authenticity",
-            "Financial Analyst - Analyzed financial metrics and trends", 
-            "Investment Advisor - Provided investment recommendations",
-            "Risk Assessor - Conducted comprehensive risk analysis"
-        ]
+        if not verified:
+            # Rejections are neither cached nor shared with waiting duplicates,
+            # which run their own crew once this job releases the lock
+            if analysis_record:
+                analysis_record.status = "failed"
+                analysis_record.detailed_result = analysis_result
+                analysis_record.error_message = analysis_result
+                analysis_record.agents_used = VERIFIER_ONLY
+                analysis_record.completed_at = utcnow()
+                analysis_record.processing_time_seconds = time.monotonic() - start_time
+                try:
+                    db.commit()
+                except Exception as e:
+                    print(f"Database save failed: {e}")
+            
+            current_task.update_state(
+                state="SUCCESS",
+                meta={"status": "Document rejected by verification", "progress": 100}
+            )
+            
+            publish_stream_event(job_id, "failed", {"rejected": True, "error": analysis_result})
+            
+            return {
+                "status": "rejected",
+                "message": "Document failed verification; analysis was not run",
+                "cached": False,
+                "result": analysis_result,
+                "agents_used": VERIFIER_ONLY,
+                "processing_time": time.monotonic() - start_time
+            }
+        
+        agents_used = AGENTS_USED
         
-        # Cache the result and update database (if available)
-        if db:
+        # Cache the result in Redis for fast repeat lookups
+        if file_hash is not None and query_hash is not None:
             try:
-                if 'file_hash' in locals() and 'query_hash' in locals():
-                    cache_entry = AnalysisCache(
-                        file_hash=file_hash,
-                        filename=filename,
-                        query_hash=query_hash,
-                        analysis_result=analysis_result,
-                        agents_used=agents_used
-                    )
-                    db.add(cache_entry)
-                
-                # Update analysis record
-                if analysis_record:
-                    end_time = datetime.utcnow()
-                    processing_time = (end_time - start_time).total_seconds()
-                    
-                    analysis_record.status = "completed"
-                    analysis_record.detailed_result = analysis_result
-                    analysis_record.agents_used = agents_used
-                    analysis_record.completed_at = end_time
-                    analysis_record.processing_time_seconds = processing_time
-                
-                db.commit()
+                store_cached_analysis(file_hash, query_hash, analysis_result, agents_used)
+                if inflight_lock:
+                    publish_inflight_result(inflight_lock, analysis_result, agents_used)
             except Exception as e:
-                print(f"Database save failed: {e}")
+                print(f"Redis cache write failed: {e}")
+        
+        # Cache the result and update the job record
+        try:
+            if file_hash is not None and query_hash is not None:
+                db.execute(build_cache_upsert(
+                    file_hash=file_hash,
+                    filename=filename,
+                    query_hash=query_hash,
+                    analysis_result=analysis_result,
+                    agents_used=agents_used
+                ))
+            
+            # Update analysis record
+            if analysis_record:
+                analysis_record.status = "completed"
+                analysis_record.detailed_result = analysis_result
+                analysis_record.agents_used = agents_used
+                analysis_record.completed_at = utcnow()
+                analysis_record.processing_time_seconds = time.monotonic() - start_time
+            
+            db.commit()
+        except Exception as e:
+            print(f"Database save failed: {e}")
         
         # Calculate processing time
-        end_time = datetime.utcnow()
-        processing_time = (end_time - start_time).total_seconds()
+        processing_time = time.monotonic() - start_time
         
         current_task.update_state(
             state="SUCCESS",
             meta={"status": "Analysis completed successfully!", "progress": 100}
         )
         
+        publish_stream_event(job_id, "completed", {"cached": False, "result": analysis_result})
+        
         return {
             "status": "success",
             "message": "Financial document analysis completed successfully",
@@ -225,12 +527,12 @@ def analyze_financial_document_task(self, file_path: str, query: str, filename:
         # Handle errors
         error_message = f"Error processing financial document: {str(e)}"
         
-        # Update database record (if available)
-        if db and analysis_record:
+        # Update the job record
+        if analysis_record:
             try:
                 analysis_record.status = "failed"
                 analysis_record.error_message = error_message
-                analysis_record.completed_at = datetime.utcnow()
+                analysis_record.completed_at = utcnow()
                 db.commit()
             except Exception as db_error:
                 print(f"Database error update failed: {db_error}")
@@ -240,43 +542,68 @@ def analyze_financial_document_task(self, file_path: str, query: str, filename:
             meta={"status": f"Analysis failed: {error_message}", "progress": 0}
         )
         
+        publish_stream_event(job_id, "failed", {"error": error_message})
+        
         raise Exception(error_message)
         
     finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
+        # Let waiting duplicates proceed (they run the crew if we failed)
+        if inflight_lock:
             try:
-                os.remove(file_path)
-                print(f"Cleaned up temporary file: {file_path}")
-            except Exception as cleanup_error:
-                print(f"Warning: Could not clean up file {file_path}: {cleanup_error}")
+                release_inflight_lock(inflight_lock, job_id)
+            except Exception as e:
+                print(f"In-flight lock release failed: {e}")
         
-        # Close database session (if available)
-        if db:
+        # Clean up uploaded file
+        if file_blob_key:
             try:
-                db.close()
+                redis_client.delete(file_blob_key)
             except Exception as e:
-                print(f"Database close error: {e}")
+                print(f"Warning: Could not delete upload blob {file_blob_key}: {e}")
+        try:
+            os.remove(file_path)
+            print(f"Cleaned up temporary file: {file_path}")
+        except FileNotFoundError:
+            pass
+        except OSError as cleanup_error:
+            print(f"Warning: Could not clean up file {file_path}: {cleanup_error}")
+        
+        # Return the session's connection to the pool
+        try:
+            ScopedSession.remove()
+        except Exception as e:
+            print(f"Database close error: {e}")
 
 @celery_app.task
 def cleanup_old_cache_entries():
     """Periodic task to clean up old cache entries"""
-    db: Session = SessionLocal()
+    db: Session = ScopedSession()
     try:
         # Delete cache entries older than 30 days with low access count
         from datetime import timedelta
-        cutoff_date = datetime.utcnow() - timedelta(days=30)
+        cutoff_date = utcnow() - timedelta(days=30)
         
-        old_entries = db.query(AnalysisCache).filter(
+        # Single bulk DELETE; no rows are loaded into the session
+        deleted_count = db.query(AnalysisCache).filter(
             AnalysisCache.created_at < cutoff_date,
             AnalysisCache.access_count < 5
-        ).all()
+        ).delete(synchronize_session=False)
         
-        for entry in old_entries:
-            db.delete(entry)
+        db.commit()
+        return f"Cleaned up {deleted_count} old cache entries"
         
+    finally:
+        ScopedSession.remove()
+
+@celery_app.task
+def refresh_analysis_stats():
+    """Periodic task to refresh the per-status counts behind /stats"""
+    db: Session = ScopedSession()
+    try:
+        # CONCURRENTLY keeps the view readable while it is rebuilt
+        db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY analysis_stats"))
         db.commit()
-        return f"Cleaned up {len(old_entries)} old cache entries"
+        return "Refreshed analysis_stats"
         
     finally:
-        db.close()
\ No newline at end of file
+        ScopedSession.remove()
@@ -42,6 +42,10 @@ def test_async_workflow():
             
             if response.status_code == 200:
                 result = response.json()
+                if result["status"] == "cache_hit":
+                    print(f"✅ Served from cache in {upload_time:.2f} seconds (no job queued)")
+                    return None
+                
                 job_id = result["job_id"]
                 print(f"✅ Upload successful in {upload_time:.2f} seconds")
                 print(f"   Job ID: {job_id}")
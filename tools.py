@@ -1,12 +1,86 @@
 ## Importing libraries and files
 import os
+import re
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
 load_dotenv()
 
-import PyPDF2
+import pypdfium2 as pdfium
 from crewai.tools import tool
 from crewai_tools import SerperDevTool
 
+# Runs of blank lines in extracted PDF text
+BLANK_LINES = re.compile(r"\n{2,}")
+
+# PDFium is not thread-safe, so parallel extraction of long documents uses
+# processes. Off by default (1 = sequential); opt in with PDF_EXTRACT_WORKERS.
+PDF_EXTRACT_WORKERS = max(1, int(os.getenv("PDF_EXTRACT_WORKERS", "1")))
+PARALLEL_PAGE_THRESHOLD = 16  # shorter documents aren't worth splitting
+
+# One process pool per worker process, shared by all of its green threads
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
+
+def get_extract_pool() -> ProcessPoolExecutor:
+    """Return the shared PDF extraction pool, creating it on first use"""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            # Spawned children don't inherit the parent's monkey-patched state
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _extract_pool
+
+def reset_extract_pool() -> None:
+    """Discard the shared pool so the next extraction starts a fresh one"""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is not None:
+            _extract_pool.shutdown(wait=False, cancel_futures=True)
+            _extract_pool = None
+
+def extract_page_text(pdf, page_index: int) -> str:
+    """Extract and clean the text of one page with PDFium"""
+    page = pdf[page_index]
+    try:
+        textpage = page.get_textpage()
+        try:
+            content = textpage.get_text_range()
+        finally:
+            textpage.close()
+    finally:
+        page.close()
+    
+    # Clean and format the financial document data
+    return BLANK_LINES.sub("\n", content.replace("\r\n", "\n"))
+
+def extract_page_range(path: str, start: int, stop: int) -> list:
+    """Extract the text of pages [start, stop) from a PDF file"""
+    pdf = pdfium.PdfDocument(path)
+    try:
+        return [extract_page_text(pdf, page_index) for page_index in range(start, stop)]
+    finally:
+        pdf.close()
+
+def extract_pages_parallel(path: str, page_count: int) -> list:
+    """Extract all pages of a long PDF in parallel page ranges"""
+    workers = min(PDF_EXTRACT_WORKERS, page_count)
+    step = -(-page_count // workers)
+    starts = list(range(0, page_count, step))
+    stops = [min(start + step, page_count) for start in starts]
+    try:
+        ranges = get_extract_pool().map(extract_page_range, [path] * len(starts), starts, stops)
+        return [page for page_range in ranges for page in page_range]
+    except Exception as e:
+        print(f"Parallel PDF extraction failed, reading sequentially: {e}")
+        # A crashed child leaves the pool broken for every later call
+        reset_extract_pool()
+        return extract_page_range(path, 0, page_count)
+
 ## Creating search tool
 search_tool = SerperDevTool()
 
@@ -25,20 +99,19 @@ def financial_document_tool(path: str = 'data/TSLA-Q2-2025-Update.pdf') -> str:
         if not os.path.exists(path):
             return f"Error: File not found at {path}"
         
-        full_report = ""
-        with open(path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                content = page.extract_text()
-                
-                # Clean and format the financial document data
-                while "\n\n" in content:
-                    content = content.replace("\n\n", "\n")
-                
-                full_report += content + "\n"
+        pages = None
+        pdf = pdfium.PdfDocument(path)
+        try:
+            page_count = len(pdf)
+            if page_count <= PARALLEL_PAGE_THRESHOLD or PDF_EXTRACT_WORKERS <= 1:
+                pages = [extract_page_text(pdf, page_index) for page_index in range(page_count)]
+        finally:
+            pdf.close()
+        
+        if pages is None:
+            pages = extract_pages_parallel(path, page_count)
         
+        full_report = "\n".join(pages)
         return full_report if full_report.strip() else "Error: Could not extract text from PDF"
         
     except Exception as e:
@@ -49,6 +122,9 @@ def financial_document_tool(path: str = 'data/TSLA-Q2-2025-Update.pdf') -> str:
 def investment_tool(financial_document_data: str) -> str:
     """Tool to analyze financial document data for investment insights
     
+    Returns a fixed outline of the analysis areas to cover; the agent fills it
+    in from the document, so the content passed here is not processed.
+    
     Args:
         financial_document_data (str): Financial document content to analyze
         
@@ -56,13 +132,7 @@ def investment_tool(financial_document_data: str) -> str:
         str: Investment analysis results
     """
     try:
-        # Process and analyze the financial document data
-        processed_data = financial_document_data
-        
-        # Clean up the data format
-        processed_data = processed_data.replace("  ", " ")  # Remove double spaces
-        
-        # Basic analysis structure
+        # Basic analysis structure; the document text itself is not inspected
         analysis = {
             "revenue_trends": "Analysis of revenue patterns",
             "profitability": "Profit margin analysis", 
@@ -80,6 +150,9 @@ def investment_tool(financial_document_data: str) -> str:
 def risk_tool(financial_document_data: str) -> str:
     """Tool to create comprehensive risk assessment from financial data
     
+    Returns a fixed outline of the risk categories to cover; the agent fills it
+    in from the document, so the content passed here is not processed.
+    
     Args:
         financial_document_data (str): Financial document content to analyze
         
@@ -15,7 +15,7 @@ def view_analysis_details(analysis_id=None):
         print("=" * 80)
         
         if analysis_id:
-            analysis = db.query(AnalysisResult).filter(AnalysisResult.id == analysis_id).first()
+            analysis = db.get(AnalysisResult, analysis_id)
             analyses = [analysis] if analysis else []
         else:
             # Get the most recent completed analysis